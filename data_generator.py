@@ -1,11 +1,12 @@
 # data_generator.py
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
-import json
 
-# Set random seed for reproducibility
-np.random.seed(42)
+# Seeded generator for reproducibility; every field is drawn in bulk
+rng = np.random.default_rng(42)
 
 def generate_customers(n=1000):
     """Generate realistic customer data"""
@@ -14,70 +15,102 @@ def generate_customers(n=1000):
         'name': [f'Customer_{i}' for i in range(1, n+1)],
         'email': [f'user{i}@email.com' for i in range(1, n+1)],
         'signup_date': pd.date_range('2023-01-01', periods=n, freq='D'),
-        'location': np.random.choice(['London', 'Manchester', 'Birmingham', 'Edinburgh'], n),
-        'age': np.random.randint(18, 70, n),
-        'customer_segment': np.random.choice(['Premium', 'Standard', 'Basic'], n, p=[0.2, 0.5, 0.3])
+        'location': rng.choice(['London', 'Manchester', 'Birmingham', 'Edinburgh'], n),
+        'age': rng.integers(18, 70, n),
+        'customer_segment': rng.choice(['Premium', 'Standard', 'Basic'], n, p=[0.2, 0.5, 0.3])
     })
 
 def generate_products(n=100):
     """Generate product catalog"""
     categories = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
-    products = []
+    product_ids = np.arange(1, n+1)
+    category = rng.choice(categories, n)
+    base_price = rng.uniform(10, 500, n)
     
-    for i in range(1, n+1):
-        category = np.random.choice(categories)
-        base_price = np.random.uniform(10, 500)
-        products.append({
-            'product_id': i,
-            'name': f'{category}_Product_{i}',
-            'category': category,
-            'price': round(base_price, 2),
-            'cost': round(base_price * 0.6, 2),  # 40% margin
-            'stock_quantity': np.random.randint(0, 100)
-        })
-    
-    return pd.DataFrame(products)
+    return pd.DataFrame({
+        'product_id': product_ids,
+        'name': [f'{c}_Product_{i}' for c, i in zip(category, product_ids)],
+        'category': category,
+        'price': np.round(base_price, 2),
+        'cost': np.round(base_price * 0.6, 2),  # 40% margin
+        'stock_quantity': rng.integers(0, 100, n)
+    })
+
+ORDER_STATUSES = ['Completed', 'Pending', 'Cancelled']
+
+ORDERS_SCHEMA = pa.schema([
+    ('order_id', pa.int32()),
+    ('customer_id', pa.int32()),
+    ('order_date', pa.timestamp('ns')),
+    ('total_amount', pa.float64()),
+    ('status', pa.dictionary(pa.int8(), pa.string()))
+])
 
-def generate_orders(customers, products, n=5000):
-    """Generate realistic order data"""
-    orders = []
+def generate_orders(customers, products, n=5000, chunk_size=100_000):
+    """Generate realistic order data as Arrow record batches of up to chunk_size orders"""
+    customer_pool = customers['customer_id'].to_numpy()
+    price_arr = products['price'].to_numpy()
+    n_products = len(price_arr)
+    statuses = pa.array(ORDER_STATUSES)
     
-    for i in range(1, n+1):
-        customer_id = np.random.choice(customers['customer_id'])
-        order_date = pd.Timestamp('2023-01-01') + pd.Timedelta(days=np.random.randint(0, 365))
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        customer_ids = rng.choice(customer_pool, size)
+        order_dates = (np.datetime64('2023-01-01', 'D') + rng.integers(0, 365, size)).astype('datetime64[ns]')
         
         # Number of items in order (1-5 items)
-        num_items = np.random.choice([1, 2, 3, 4, 5], p=[0.4, 0.3, 0.2, 0.08, 0.02])
-        selected_products = np.random.choice(products['product_id'], num_items, replace=False)
+        num_items = rng.choice([1, 2, 3, 4, 5], size, p=[0.4, 0.3, 0.2, 0.08, 0.02])
+        offsets = np.concatenate([[0], np.cumsum(num_items)])
         
-        total_amount = 0
-        for product_id in selected_products:
-            price = products[products['product_id'] == product_id]['price'].iloc[0]
-            quantity = np.random.randint(1, 4)
-            total_amount += price * quantity
+        # Flat (order, product) line items, products distinct within each order:
+        # the k smallest of a row of random keys give a sample without replacement
+        prod_idx = np.empty(offsets[-1], dtype=np.intp)
+        for k in np.unique(num_items):
+            rows = np.flatnonzero(num_items == k)
+            keys = rng.random((len(rows), n_products))
+            picks = np.argpartition(keys, k - 1, axis=1)[:, :k]
+            prod_idx[offsets[rows][:, None] + np.arange(k)] = picks
         
-        orders.append({
-            'order_id': i,
-            'customer_id': customer_id,
-            'order_date': order_date,
-            'total_amount': round(total_amount, 2),
-            'status': np.random.choice(['Completed', 'Pending', 'Cancelled'], p=[0.85, 0.1, 0.05])
-        })
-    
-    return pd.DataFrame(orders)
+        # Line items are contiguous per order, so each total is a segment sum
+        quantity = rng.integers(1, 4, offsets[-1])
+        line_amount = price_arr[prod_idx]
+        line_amount *= quantity
+        total_amount = np.add.reduceat(line_amount, offsets[:-1])
+        
+        status_idx = rng.choice(len(ORDER_STATUSES), size, p=[0.85, 0.1, 0.05]).astype(np.int8)
+        
+        yield pa.RecordBatch.from_arrays([
+            pa.array(np.arange(start + 1, start + size + 1, dtype=np.int32)),
+            pa.array(customer_ids.astype(np.int32)),
+            pa.array(order_dates),
+            pa.array(np.round(total_amount, 2)),
+            pa.DictionaryArray.from_arrays(pa.array(status_idx), statuses)
+        ], schema=ORDERS_SCHEMA)
+
+def write_orders(path, batches):
+    """Stream order batches into a Parquet file, one row group per batch"""
+    n_rows = 0
+    writer = pq.ParquetWriter(path, ORDERS_SCHEMA, compression='zstd')
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            n_rows += batch.num_rows
+    finally:
+        writer.close()
+    return n_rows
 
 # Generate all data
 print("Generating synthetic e-commerce data...")
 customers = generate_customers(1000)
 products = generate_products(100)
-orders = generate_orders(customers, products, 5000)
 
-# Save in different formats for ETL practice
-customers.to_csv('data/customers.csv', index=False)
-products.to_json('data/products.json', orient='records', indent=2)
-orders.to_csv('data/orders.csv', index=False)
+# Save as Parquet so dtypes survive the round-trip into the ETL; orders are
+# streamed batch by batch so peak memory is bounded by chunk_size, not n
+customers.to_parquet('data/customers.parquet', compression='zstd', index=False)
+products.to_parquet('data/products.parquet', compression='zstd', index=False)
+n_orders = write_orders('data/orders.parquet', generate_orders(customers, products, 5000))
 
 print("✅ Data generated successfully!")
 print(f"- {len(customers)} customers")
 print(f"- {len(products)} products") 
-print(f"- {len(orders)} orders")
\ No newline at end of file
+print(f"- {n_orders} orders")
\ No newline at end of file
@@ -0,0 +1,28 @@
+# src/db_connection.py
+import sqlite3
+
+# Read-side tuning shared by the analysis and visualisation sessions
+READ_PRAGMAS = """
+    PRAGMA cache_size=-200000;
+    PRAGMA temp_store=MEMORY;
+"""
+
+class SharedConnection:
+    """Lazily opened SQLite connection reused across queries"""
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._connection = None
+    
+    def get(self):
+        """Return the shared database connection, opening it on first use"""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.executescript(READ_PRAGMAS)
+        return self._connection
+    
+    def close(self):
+        """Close the shared database connection"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
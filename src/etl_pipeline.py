@@ -2,7 +2,6 @@
 import pandas as pd
 import numpy as np
 import sqlite3
-import json
 from datetime import datetime
 import logging
 
@@ -24,14 +23,10 @@ class ECommerceETL:
         logger.info("Starting data extraction...")
         
         try:
-            # Extract from CSV
-            self.customers = pd.read_csv('data/customers.csv')
-            self.orders = pd.read_csv('data/orders.csv')
-            
-            # Extract from JSON
-            with open('data/products.json', 'r') as f:
-                products_data = json.load(f)
-            self.products = pd.DataFrame(products_data)
+            # Extract from Parquet
+            self.customers = pd.read_parquet('data/customers.parquet', dtype_backend='pyarrow')
+            self.products = pd.read_parquet('data/products.parquet', dtype_backend='pyarrow')
+            self.orders = pd.read_parquet('data/orders.parquet', dtype_backend='pyarrow')
             
             logger.info(f"✅ Extracted {len(self.customers)} customers")
             logger.info(f"✅ Extracted {len(self.products)} products")
@@ -47,16 +42,33 @@ class ECommerceETL:
         
         try:
             # Transform customers data
-            self.customers['signup_date'] = pd.to_datetime(self.customers['signup_date'])
-            self.customers['days_since_signup'] = (datetime.now() - self.customers['signup_date']).dt.days
+            today = np.datetime64('today', 'D')
+            signup = self.customers['signup_date'].to_numpy().astype('datetime64[D]')
+            self.customers['days_since_signup'] = pd.array((today - signup).astype(np.int32), dtype='int32[pyarrow]')
             
-            # Transform orders data
-            self.orders['order_date'] = pd.to_datetime(self.orders['order_date'])
-            self.orders['order_month'] = self.orders['order_date'].dt.to_period('M').astype(str)
+            # Transform orders data (Parquet keeps the datetime dtypes)
+            # datetime64[M] formats as 'YYYY-MM' directly in numpy
+            self.orders['order_month'] = self.orders['order_date'].to_numpy().astype('datetime64[M]').astype(str)
             self.orders['order_year'] = self.orders['order_date'].dt.year
             
             # Add derived columns to products data
-            self.products['profit_margin'] = ((self.products['price'] - self.products['cost']) / self.products['price'] * 100).round(2)
+            price = self.products['price'].to_numpy(dtype=np.float64)
+            cost = self.products['cost'].to_numpy(dtype=np.float64)
+            margin = np.empty_like(price)
+            np.subtract(price, cost, out=margin)
+            np.divide(margin, price, out=margin)
+            margin *= 100
+            np.round(margin, 2, out=margin)
+            self.products['profit_margin'] = pd.array(margin, dtype='float64[pyarrow]')
+            
+            # Store low-cardinality string columns as categoricals
+            for col in ['location', 'customer_segment']:
+                self.customers[col] = self.customers[col].astype('category')
+            self.orders['status'] = self.orders['status'].astype('category')
+            self.orders['order_month'] = pd.Categorical(self.orders['order_month'], ordered=True)
+            self.products['category'] = self.products['category'].astype('category')
+            
+            self._downcast()
             
             # Data quality checks
             self._validate_data()
@@ -67,6 +79,15 @@ class ECommerceETL:
             logger.error(f"❌ Error during transformation: {e}")
             raise
     
+    def _downcast(self):
+        """Shrink integer columns to the smallest dtype that holds their values"""
+        for df, cols in [(self.customers, ['customer_id', 'age']),
+                         (self.products, ['product_id', 'stock_quantity']),
+                         (self.orders, ['order_id', 'customer_id'])]:
+            for col in cols:
+                df[col] = pd.to_numeric(df[col], downcast='unsigned')
+        self.orders['order_year'] = self.orders['order_year'].astype('int16[pyarrow]')
+    
     def _validate_data(self):
         """Validate data quality"""
         logger.info("Performing data quality checks...")
@@ -99,10 +120,18 @@ class ECommerceETL:
         try:
             conn = sqlite3.connect(self.db_path)
             
+            # Bulk-load settings: the database is rebuilt from source on every run
+            conn.executescript("""
+                PRAGMA synchronous=OFF;
+                PRAGMA journal_mode=MEMORY;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-200000;
+            """)
+            
             # Load tables into database
-            self.customers.to_sql('customers', conn, if_exists='replace', index=False)
-            self.products.to_sql('products', conn, if_exists='replace', index=False)
-            self.orders.to_sql('orders', conn, if_exists='replace', index=False)
+            self.customers.to_sql('customers', conn, if_exists='replace', index=False, method='multi', chunksize=1000)
+            self.products.to_sql('products', conn, if_exists='replace', index=False, method='multi', chunksize=1000)
+            self.orders.to_sql('orders', conn, if_exists='replace', index=False, method='multi', chunksize=1000)
             
             # Create indexes for performance
             cursor = conn.cursor()
@@ -111,6 +140,35 @@ class ECommerceETL:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_date ON orders(order_date)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_customer ON orders(customer_id)")
             
+            # Materialise the aggregates the dashboards read on every run
+            cursor.executescript("""
+                DROP TABLE IF EXISTS customer_clv;
+                CREATE TABLE customer_clv AS
+                SELECT customer_id, SUM(total_amount) AS clv, COUNT(*) AS n_orders
+                FROM orders
+                WHERE status = 'Completed'
+                GROUP BY customer_id;
+                
+                DROP TABLE IF EXISTS monthly_revenue;
+                CREATE TABLE monthly_revenue AS
+                SELECT order_month, SUM(total_amount) AS revenue, COUNT(*) AS n_orders,
+                       AVG(total_amount) AS avg_order_value
+                FROM orders
+                WHERE status = 'Completed'
+                GROUP BY order_month;
+                
+                DROP TABLE IF EXISTS location_revenue;
+                CREATE TABLE location_revenue AS
+                SELECT c.location, SUM(o.total_amount) AS revenue
+                FROM orders o
+                JOIN customers c ON o.customer_id = c.customer_id
+                WHERE o.status = 'Completed'
+                GROUP BY c.location;
+            """)
+            
+            # Refresh planner statistics so queries pick up the new indexes
+            cursor.execute("ANALYZE")
+            
             conn.commit()
             conn.close()
             
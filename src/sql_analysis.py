@@ -1,7 +1,8 @@
-import sqlite3
 import pandas as pd
 import logging
 
+from db_connection import SharedConnection
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -10,14 +11,17 @@ class SQLAnalyzer:
     
     def __init__(self, db_path='ecommerce.db'):
         self.db_path = db_path
+        self._db = SharedConnection(db_path)
+    
+    def close(self):
+        """Close the shared database connection"""
+        self._db.close()
     
     def run_query(self, query, query_name="Query"):
         """Run a SQL query and return results"""
         try:
-            conn = sqlite3.connect(self.db_path)
             logger.info(f"🔍 Running {query_name}...")
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            df = pd.read_sql_query(query, self._db.get(), dtype_backend='pyarrow')
             logger.info(f"✅ {query_name} completed - {len(df)} rows returned")
             return df
         except Exception as e:
@@ -114,14 +118,17 @@ class SQLAnalyzer:
         print("🚀 STARTING SQL ANALYSIS")
         print("="*60)
         
-        # Run all analyses
-        analyses = {
-            'Database Overview': self.basic_stats(),
-            'Monthly Revenue': self.monthly_revenue_analysis(),
-            'Customer Segments': self.customer_segmentation(),
-            'Geographic Performance': self.geographic_analysis(),
-            'Top Revenue Months': self.top_revenue_months()
-        }
+        # Run all analyses on one connection
+        try:
+            analyses = {
+                'Database Overview': self.basic_stats(),
+                'Monthly Revenue': self.monthly_revenue_analysis(),
+                'Customer Segments': self.customer_segmentation(),
+                'Geographic Performance': self.geographic_analysis(),
+                'Top Revenue Months': self.top_revenue_months()
+            }
+        finally:
+            self.close()
         
         # Display results
         for name, df in analyses.items():
@@ -1,48 +1,111 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 import matplotlib.pyplot as plt
 import seaborn as sns
-import sqlite3
 from datetime import datetime
 import warnings
+from db_connection import SharedConnection
 warnings.filterwarnings('ignore')
 
 # Set style for professional-looking plots
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
+# Aggregate tables materialised by ECommerceETL.load_data
+AGGREGATE_TABLES = ['customer_clv', 'monthly_revenue', 'location_revenue']
+
 class ECommerceVisualiser:
     """Create professional visualisations for e-commerce analytics"""
     
     def __init__(self, db_path='ecommerce.db'):
         self.db_path = db_path
         self.fig_size = (15, 12)
+        self._aggregates = {}
+        self._db = SharedConnection(db_path)
         
+    def close(self):
+        """Close the shared database connection"""
+        self._db.close()
+    
     def load_data(self):
         """Load data from database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.get()
+        
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in AGGREGATE_TABLES if table not in existing]
+        if missing:
+            raise RuntimeError(f"{self.db_path} is missing aggregate tables {missing}; "
+                               "run src/etl_pipeline.py first")
+        
+        # Load only the columns the dashboards use; aggregates come from SQL below
+        self.customers = pd.read_sql_query(
+            "SELECT customer_id, customer_segment, signup_date FROM customers", conn, dtype_backend='pyarrow')
+        self.orders = pd.read_sql_query(
+            "SELECT customer_id, total_amount FROM orders WHERE status = 'Completed'", conn, dtype_backend='pyarrow')
+        self.products = pd.read_sql_query(
+            "SELECT product_id, category, price, profit_margin FROM products", conn, dtype_backend='pyarrow')
         
-        # Load main datasets
-        self.customers = pd.read_sql_query("SELECT * FROM customers", conn)
-        self.orders = pd.read_sql_query("SELECT * FROM orders WHERE status = 'Completed'", conn)
-        self.products = pd.read_sql_query("SELECT * FROM products", conn)
+        # Convert date columns, keeping them Arrow-backed
+        self.customers['signup_date'] = self.customers['signup_date'].astype(pd.ArrowDtype(pa.timestamp('us')))
         
-        # Convert date columns
-        self.orders['order_date'] = pd.to_datetime(self.orders['order_date'])
-        self.customers['signup_date'] = pd.to_datetime(self.customers['signup_date'])
+        # SQLite stores categoricals as plain text, so re-cast after loading
+        self.customers['customer_segment'] = self.customers['customer_segment'].astype('category')
+        self.products['category'] = self.products['category'].astype('category')
         
-        conn.close()
+        # Segment lookup keyed by customer_id for tagging orders without a merge
+        self._segment_by_cid = self.customers.set_index('customer_id')['customer_segment']
+        
+        self._aggregates = {}
         print("✅ Data loaded successfully")
     
+    def _aggregate(self, name, query):
+        """Run an aggregation query once and cache the result"""
+        if name not in self._aggregates:
+            self._aggregates[name] = pd.read_sql_query(query, self._db.get(), dtype_backend='pyarrow')
+        return self._aggregates[name]
+    
+    def _monthly_revenue_df(self):
+        """Revenue, order count and average order value per month"""
+        return self._aggregate('monthly_revenue', """
+            SELECT order_month AS month, revenue, n_orders AS orders, avg_order_value
+            FROM monthly_revenue
+            ORDER BY order_month
+        """)
+    
+    def _customer_clv_df(self):
+        """Lifetime value and order count per ordering customer"""
+        return self._aggregate('customer_clv', """
+            SELECT customer_id, clv, n_orders AS orders
+            FROM customer_clv
+        """)
+    
+    def _location_revenue_df(self):
+        """Completed-order revenue per customer location"""
+        return self._aggregate('location_revenue', """
+            SELECT location, revenue
+            FROM location_revenue
+            ORDER BY revenue
+        """)
+    
+    def _avg_by_loc_segment_df(self):
+        """Average customer value per location and segment, counting non-buyers as 0"""
+        return self._aggregate('avg_by_loc_segment', """
+            SELECT c.location,
+                   c.customer_segment,
+                   AVG(COALESCE(v.clv, 0)) AS avg_value
+            FROM customers c
+            LEFT JOIN customer_clv v ON c.customer_id = v.customer_id
+            GROUP BY c.location, c.customer_segment
+        """)
+    
     def create_revenue_dashboard(self):
         """Create comprehensive revenue analysis dashboard"""
         fig, axes = plt.subplots(2, 2, figsize=self.fig_size)
         fig.suptitle('📊 E-Commerce Revenue Analytics Dashboard', fontsize=16, fontweight='bold')
         
         # 1. Monthly Revenue Trend
-        monthly_revenue = self.orders.groupby('order_month')['total_amount'].agg(['sum', 'count', 'mean']).reset_index()
-        monthly_revenue.columns = ['month', 'revenue', 'orders', 'avg_order_value']
-        monthly_revenue = monthly_revenue.sort_values('month')
+        monthly_revenue = self._monthly_revenue_df()
         
         axes[0,0].plot(monthly_revenue['month'], monthly_revenue['revenue'], 
                       marker='o', linewidth=2, markersize=6, color='#2E86AB')
@@ -53,14 +116,16 @@ class ECommerceVisualiser:
         axes[0,0].grid(True, alpha=0.3)
         
         # Add revenue annotations
-        for i, row in monthly_revenue.iterrows():
-            if i % 2 == 0:  # Annotate every other point to avoid crowding
-                axes[0,0].annotate(f'£{row["revenue"]:,.0f}', 
-                                 (row['month'], row['revenue']),
-                                 textcoords="offset points", xytext=(0,10), ha='center')
+        # Annotate every other point to avoid crowding
+        months = monthly_revenue['month'].to_numpy()[::2]
+        revenues = monthly_revenue['revenue'].to_numpy()[::2]
+        for month, revenue in zip(months, revenues):
+            axes[0,0].annotate(f'£{revenue:,.0f}', 
+                             (month, revenue),
+                             textcoords="offset points", xytext=(0,10), ha='center')
         
         # 2. Customer Lifetime Value Distribution in a histogram
-        customer_clv = self.orders.groupby('customer_id')['total_amount'].sum()
+        customer_clv = self._customer_clv_df().set_index('customer_id')['clv']
         
         axes[0,1].hist(customer_clv, bins=30, alpha=0.7, color='#A23B72', edgecolor='black')
         axes[0,1].axvline(customer_clv.mean(), color='red', linestyle='--', 
@@ -74,22 +139,20 @@ class ECommerceVisualiser:
         axes[0,1].grid(True, alpha=0.3)
         
         # 3. Revenue by Location in a horizontal bar chart
-        location_revenue = self.orders.merge(self.customers, on='customer_id').groupby('location')['total_amount'].sum().sort_values(ascending=True)
+        location_revenue = self._location_revenue_df().set_index('location')['revenue']
         
         bars = axes[1,0].barh(location_revenue.index, location_revenue.values, color='#F18F01')
         axes[1,0].set_title('🌍 Revenue by Location', fontweight='bold')
         axes[1,0].set_xlabel('Total Revenue (£)')
         
         # Add value labels on bars
-        for bar in bars:
-            width = bar.get_width()
-            axes[1,0].text(width, bar.get_y() + bar.get_height()/2, 
-                          f'£{width:,.0f}', ha='left', va='center')
+        axes[1,0].bar_label(bars, labels=[f'£{v:,.0f}' for v in location_revenue.values], padding=3)
         
         # 4. Order Value Distribution by Customer Segment in a boxplot
-        order_segment_data = self.orders.merge(self.customers, on='customer_id')
+        segments = self._segment_by_cid.reindex(self.orders['customer_id']).to_numpy()
         
-        sns.boxplot(data=order_segment_data, x='customer_segment', y='total_amount', ax=axes[1,1])
+        sns.boxplot(x=segments, y=self.orders['total_amount'].to_numpy(), 
+                    order=self._segment_by_cid.cat.categories, ax=axes[1,1])
         axes[1,1].set_title('📦 Order Value by Customer Segment', fontweight='bold')
         axes[1,1].set_xlabel('Customer Segment')
         axes[1,1].set_ylabel('Order Value (£)')
@@ -114,7 +177,7 @@ class ECommerceVisualiser:
         axes[0,0].set_title('🎯 Customer Segmentation', fontweight='bold')
         
         # 2. Customer Acquisition Over Time in a line chart
-        monthly_signups = self.customers.groupby(self.customers['signup_date'].dt.to_period('M')).size()
+        monthly_signups = self.customers.groupby(self.customers['signup_date'].dt.strftime('%Y-%m')).size()
         
         axes[0,1].plot(monthly_signups.index.astype(str), monthly_signups.values, 
                       marker='s', linewidth=2, markersize=4, color='#96CEB4')
@@ -125,7 +188,7 @@ class ECommerceVisualiser:
         axes[0,1].grid(True, alpha=0.3)
         
         # 3. Orders per Customer Distribution in a histogram
-        orders_per_customer = self.orders.groupby('customer_id').size()
+        orders_per_customer = self._customer_clv_df()['orders']
         
         axes[1,0].hist(orders_per_customer, bins=range(1, orders_per_customer.max()+2), 
                       alpha=0.7, color='#FFEAA7', edgecolor='black')
@@ -135,17 +198,11 @@ class ECommerceVisualiser:
         axes[1,0].grid(True, alpha=0.3)
         
         # 4. Customer Value Heatmap by Location and Segment in a heatmap
-        customer_summary = self.customers.merge(
-            self.orders.groupby('customer_id')['total_amount'].sum().reset_index(),
-            on='customer_id', how='left'
-        ).fillna(0)
-        
-        heatmap_data = customer_summary.pivot_table(
-            values='total_amount', 
+        heatmap_data = self._avg_by_loc_segment_df().pivot(
             index='location', 
             columns='customer_segment', 
-            aggfunc='mean'
-        )
+            values='avg_value'
+        ).astype('float64')  # seaborn's colour mapping needs a NumPy dtype
         
         sns.heatmap(heatmap_data, annot=True, fmt='.0f', cmap='YlOrRd', ax=axes[1,1])
         axes[1,1].set_title('🔥 Avg Customer Value Heatmap', fontweight='bold')
@@ -203,15 +260,12 @@ class ECommerceVisualiser:
         axes[1,0].tick_params(axis='x', rotation=45)
         
         # 4. Price vs Profit Margin Scatter
-        for category in self.products['category'].unique():
-            cat_data = self.products[self.products['category'] == category]
-            axes[1,1].scatter(cat_data['price'], cat_data['profit_margin'], 
-                            label=category, alpha=0.7, s=50)
+        sns.scatterplot(data=self.products, x='price', y='profit_margin', hue='category', 
+                        ax=axes[1,1], alpha=0.7, s=50)
         
         axes[1,1].set_title('💡 Price vs Profit Margin', fontweight='bold')
         axes[1,1].set_xlabel('Price (£)')
         axes[1,1].set_ylabel('Profit Margin (%)')
-        axes[1,1].legend()
         axes[1,1].grid(True, alpha=0.3)
         
         plt.tight_layout()
@@ -227,8 +281,7 @@ class ECommerceVisualiser:
         avg_order_value = self.orders['total_amount'].mean()
         
         # Customer metrics
-        customer_clv = self.orders.groupby('customer_id')['total_amount'].sum()
-        avg_clv = customer_clv.mean()
+        avg_clv = self._customer_clv_df()['clv'].mean()
         
         # Create summary visualisation
         fig, ax = plt.subplots(1, 1, figsize=(12, 8))
@@ -267,19 +320,22 @@ class ECommerceVisualiser:
         """Generate complete visualisation suite"""
         print("🎨 Starting visualisation generation...")
         
-        self.load_data()
-        
-        print("📊 Creating revenue dashboard...")
-        self.create_revenue_dashboard()
-        
-        print("👥 Creating customer analytics...")
-        self.create_customer_analytics()
-        
-        print("📦 Creating product analytics...")
-        self.create_product_analytics()
-        
-        print("📈 Creating summary metrics...")
-        self.create_summary_metrics()
+        try:
+            self.load_data()
+            
+            print("📊 Creating revenue dashboard...")
+            self.create_revenue_dashboard()
+            
+            print("👥 Creating customer analytics...")
+            self.create_customer_analytics()
+            
+            print("📦 Creating product analytics...")
+            self.create_product_analytics()
+            
+            print("📈 Creating summary metrics...")
+            self.create_summary_metrics()
+        finally:
+            self.close()
         
         print("\n✅ All visualisations created successfully!")
         print("📁 Generated files:")